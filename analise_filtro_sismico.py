@@ -16,9 +16,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 # Importar módulos das funções
 from src.sinal_sintetico import generate_synthetic_seismic_signal
-from src.filtro_fft import butter_bandpass, butter_bandpass_filter, design_fir_bandpass_filter, apply_fir_filter
+from src.filtro_fft import butter_bandpass, butter_bandpass_sos, butter_bandpass_filter, design_fir_bandpass_filter, apply_fir_filter
 from src.analise_filtro import analyze_impulse_response, plot_impulse_response, plot_pole_zero_diagram
-from src.calculo_metricas import calculate_metrics, print_metrics_table
+from src.calculo_metricas import calculate_metrics, print_metrics_table, detect_peaks
+from src.montagem_traco import segments_from_stream, assemble_segments, filter_segments, summarize_gaps
+from src.espectro import welch_psd, welch_psd_runs
+from src.tres_componentes import load_three_components, bandpass_components, polarization_attributes, combined_trigger
+from src.armazenamento_resultados import open_results_store, store_results, source_is_current, file_checksum
 from src.visualizacao import plot_time_domain, plot_frequency_domain, plot_filter_response
 
 
@@ -59,18 +63,27 @@ def main():
     
     try:
         from obspy import read
-        st = read("data/terremoto_real.mseed")
-        tr = st[0]
-        real_data = tr.data
-        real_times = tr.times()
-        real_fs = tr.stats.sampling_rate
+        real_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "terremoto_real.mseed")
+        st = read(real_path)
+        segments = segments_from_stream(st)
+        real_fs = segments[0]['fs']
+        
+        # Montagem do traço (lacunas/sobreposições) já na frequência configurada
+        real_data, real_runs, real_gaps = assemble_segments(segments, fs=fs)
+        real_times = np.arange(len(real_data)) / fs
+        gap_summary = summarize_gaps(real_gaps)
         
         print(f"  Sinal real carregado com sucesso!")
-        print(f"  Pontos: {len(real_data)} | Fs: {real_fs} Hz")
+        real_id = st[0].stats
+        real_checksum = file_checksum(real_path)
+        
+        print(f"  Segmentos: {len(segments)} | Trechos contíguos: {len(real_runs)}")
+        print(f"  Lacunas curtas: {gap_summary['short']} | longas: {gap_summary['long']} | "
+              f"sobreposições: {gap_summary['overlap']}")
+        print(f"  Pontos: {real_data.count()} válidos de {len(real_data)} | Fs: {real_fs} Hz")
         
-        # Redimensionar se necessário
         if real_fs != fs:
-            print(f"  Aviso: Fs do sinal real ({real_fs} Hz) diferente da configurada ({fs} Hz)")
+            print(f"  Sinal real reamostrado de {real_fs} Hz para {fs} Hz")
     
     except Exception as e:
         print(f"  Erro ao carregar sinal real: {e}")
@@ -87,6 +100,9 @@ def main():
     print(f"  Filtro IIR Butterworth (ordem {order}) projetado")
     print(f"    Coeficientes b: {len(b_iir)}, a: {len(a_iir)}")
     
+    # Mesmo filtro em seções de segunda ordem (estável para registros longos)
+    sos_iir = butter_bandpass_sos(lowcut, highcut, fs, order)
+    
     # Filtro FIR
     fir_taps = design_fir_bandpass_filter(lowcut, highcut, fs, numtaps=101, method='window')
     print(f"  Filtro FIR (101 taps, janela Hamming) projetado")
@@ -104,19 +120,86 @@ def main():
     
     print("  Filtros aplicados com sucesso!")
     
+    # Sinal real: cada trecho contíguo é filtrado separadamente
+    if real_data is not None:
+        real_iir = filter_segments(real_data, real_runs, sos=sos_iir)
+        print(f"  Sinal real filtrado (IIR) em {len(real_runs)} trecho(s) contíguo(s)")
+    
+    # Três componentes (se baixadas): filtragem conjunta, polarização e gatilho combinado
+    path_3c = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "terremoto_real_3c.mseed")
+    if os.path.exists(path_3c):
+        from obspy import read
+        data_3c, _, _, runs_3c = load_three_components(read(path_3c), fs=fs)
+        filtered_3c = bandpass_components(data_3c, runs_3c, sos=sos_iir)
+        polarization = polarization_attributes(filtered_3c, fs, win_len=20.0)
+        triggers_3c, _, _ = combined_trigger(filtered_3c, fs, sta=5.0, lta=60.0, runs=runs_3c)
+        print(f"  Três componentes filtradas: {filtered_3c.shape[1]} amostras")
+        print(f"    Retilinearidade média: {np.nanmean(polarization['rectilinearity']):.3f}")
+        print(f"    Gatilhos combinados: {len(triggers_3c)}")
+    
     # 5. CALCULAR MÉTRICAS
     print("\n" + "-"*40)
     print("5. CALCULANDO MÉTRICAS DE DESEMPENHO")
     print("-"*40)
     
+    # PSDs de Welch (calculadas uma vez e reutilizadas nas métricas e gráficos)
+    freqs, psd_original = welch_psd(synthetic, fs)
+    _, psd_iir = welch_psd(synthetic_iir, fs)
+    _, psd_fir = welch_psd(synthetic_fir, fs)
+    
     # Métricas para IIR
-    metrics_iir = calculate_metrics(synthetic, synthetic_iir, clean, fs, lowcut, highcut)
+    metrics_iir = calculate_metrics(synthetic, synthetic_iir, clean, fs, lowcut, highcut,
+                                    spectra=(freqs, psd_original, psd_iir))
     print_metrics_table(metrics_iir, "IIR Butterworth")
     
     # Métricas para FIR
-    metrics_fir = calculate_metrics(synthetic, synthetic_fir, clean, fs, lowcut, highcut)
+    metrics_fir = calculate_metrics(synthetic, synthetic_fir, clean, fs, lowcut, highcut,
+                                    spectra=(freqs, psd_original, psd_fir))
     print_metrics_table(metrics_fir, "FIR (Hamming)")
     
+    # Métricas do sinal real (amostras mascaradas são ignoradas)
+    if real_data is not None:
+        freqs_real, psd_real = welch_psd_runs(real_data, real_runs, fs)
+        _, psd_real_iir = welch_psd_runs(real_iir, real_runs, fs)
+        metrics_real = calculate_metrics(real_data, real_iir, None, fs, lowcut, highcut,
+                                         spectra=(freqs_real, psd_real, psd_real_iir))
+        print_metrics_table(metrics_real, "IIR Butterworth (sinal real)")
+    
+    # Persistir métricas e detecções (picos) para consultas futuras
+    results_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dados", "resultados.sqlite")
+    conn = open_results_store(results_path)
+    iir_config = {'tipo': 'IIR Butterworth', 'lowcut': lowcut, 'highcut': highcut, 'order': order, 'fs': fs,
+                  'forma': 'sos'}
+    fir_config = {'tipo': 'FIR', 'lowcut': lowcut, 'highcut': highcut, 'numtaps': 101,
+                  'window': 'hamming', 'fs': fs}
+    
+    synthetic_results = [
+        {'station': 'SINTETICO', 'channel': 'Z', 'starttime': 0.0, 'endtime': float(duration),
+         'filter': config, 'metrics': metrics,
+         'detections': [{'time': float(t[i]), 'value': float(filtered[i])} for i in detect_peaks(filtered, fs)]}
+        for config, metrics, filtered in [(iir_config, metrics_iir, synthetic_iir),
+                                          (fir_config, metrics_fir, synthetic_fir)]
+    ]
+    store_results(conn, 'sintetico', synthetic_results)
+    
+    if real_data is not None:
+        # Caminho relativo ao repositório: o mesmo arquivo em outra cópia é a mesma origem
+        real_source = os.path.relpath(real_path, os.path.dirname(os.path.abspath(__file__))).replace(os.sep, '/')
+        if source_is_current(conn, real_source, real_checksum, [iir_config]):
+            print("  Sinal real já processado com o mesmo conteúdo e filtro; resultados mantidos")
+        else:
+            t0_real = segments[0]['start']
+            real_peaks = [i for i in detect_peaks(real_iir.filled(0.0), fs) if not real_iir.mask[i]]
+            store_results(conn, real_source, [
+                {'network': real_id.network, 'station': real_id.station, 'channel': real_id.channel,
+                 'starttime': t0_real, 'endtime': t0_real + len(real_data) / fs,
+                 'filter': iir_config, 'metrics': metrics_real,
+                 'detections': [{'time': t0_real + i / fs, 'value': float(real_iir[i])} for i in real_peaks]}
+            ], checksum=real_checksum)
+    
+    conn.close()
+    print(f"\n  Resultados salvos em: {results_path}")
+    
     # 6. VISUALIZAÇÕES
     print("\n" + "-"*40)
     print("6. GERANDO VISUALIZAÇÕES")
@@ -157,19 +240,14 @@ def main():
     axes[1, 0].legend()
     axes[1, 0].grid(True, alpha=0.3)
     
-    # 6.4 Espectro de frequência - Original
-    freqs = np.fft.rfftfreq(len(synthetic), d=1/fs)
-    fft_original = np.abs(np.fft.rfft(synthetic))
-    fft_iir = np.abs(np.fft.rfft(synthetic_iir))
-    fft_fir = np.abs(np.fft.rfft(synthetic_fir))
-    
-    axes[1, 1].semilogy(freqs, fft_original, 'gray', alpha=0.5, label='Original')
-    axes[1, 1].semilogy(freqs, fft_iir, 'b', alpha=0.7, label='IIR')
-    axes[1, 1].semilogy(freqs, fft_fir, 'g', alpha=0.7, label='FIR')
+    # 6.4 Espectro de frequência (PSD de Welch)
+    axes[1, 1].semilogy(freqs, psd_original, 'gray', alpha=0.5, label='Original')
+    axes[1, 1].semilogy(freqs, psd_iir, 'b', alpha=0.7, label='IIR')
+    axes[1, 1].semilogy(freqs, psd_fir, 'g', alpha=0.7, label='FIR')
     axes[1, 1].axvspan(lowcut, highcut, alpha=0.2, color='yellow', label='Banda de interesse')
-    axes[1, 1].set_title("Espectro de Frequência")
+    axes[1, 1].set_title("Espectro de Frequência (Welch)")
     axes[1, 1].set_xlabel("Frequência (Hz)")
-    axes[1, 1].set_ylabel("Magnitude")
+    axes[1, 1].set_ylabel("PSD")
     axes[1, 1].set_xlim(0, 5)
     axes[1, 1].legend()
     axes[1, 1].grid(True, alpha=0.3)
@@ -12,6 +12,7 @@ if not os.path.exists(pasta_data):
 
 # Caminho completo para o arquivo
 caminho_completo = os.path.join(pasta_data, "terremoto_real.mseed")
+caminho_3c = os.path.join(pasta_data, "terremoto_real_3c.mseed")
 print(f"O arquivo será salvo em: {caminho_completo}")
 
 # ------------------------------------------------
@@ -26,19 +27,21 @@ endtime = t + 60 * 60  # 1 hora de dados
 print("Baixando dados da estação ANMO...")
 
 try:
-    # Baixar os dados
-    st = client.get_waveforms("IU", "ANMO", "*", "BHZ", starttime, endtime)
+    # Baixar as três componentes (Z/N/E ou Z/1/2) juntas
+    st = client.get_waveforms("IU", "ANMO", "00", "BH?", starttime, endtime)
+    st.detrend("demean")
 
-    # Pegar o primeiro sinal e limpar (remove tendência)
-    tr = st[0]
-    tr.detrend("demean")
+    # Pegar a componente vertical
+    tr = st.select(component="Z")[0]
 
     # SALVAR NA PASTA data/
     tr.write(caminho_completo, format="MSEED")
+    st.write(caminho_3c, format="MSEED")
 
     print("-" * 30)
     print("SUCESSO!")
     print(f"Arquivo salvo em: {caminho_completo}")
+    print(f"Três componentes ({', '.join(t.stats.channel for t in st)}) salvas em: {caminho_3c}")
     print(f"Tamanho do sinal: {len(tr.data)} pontos")
     print(f"Frequência de amostragem: {tr.stats.sampling_rate} Hz")
     print(f"Duração: {tr.stats.endtime - tr.stats.starttime} segundos")
@@ -0,0 +1,288 @@
+"""
+Módulo para armazenamento indexado de métricas e detecções (SQLite).
+"""
+
+import hashlib
+import json
+import numbers
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    checksum TEXT,
+    config_hash TEXT,
+    processed_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS filter_configs (
+    id INTEGER PRIMARY KEY,
+    config_hash TEXT NOT NULL UNIQUE,
+    params TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source_id INTEGER NOT NULL REFERENCES sources(id) ON DELETE CASCADE,
+    config_id INTEGER NOT NULL REFERENCES filter_configs(id),
+    network TEXT,
+    station TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    starttime REAL NOT NULL,
+    endtime REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_station_time ON runs(station, channel, starttime);
+CREATE INDEX IF NOT EXISTS idx_runs_config ON runs(config_id);
+CREATE INDEX IF NOT EXISTS idx_runs_source ON runs(source_id);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (run_id, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_metrics_name_value ON metrics(name, value);
+
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    station TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    time REAL NOT NULL,
+    value REAL,
+    attributes TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_station_time ON detections(station, channel, time);
+CREATE INDEX IF NOT EXISTS idx_detections_time ON detections(time);
+CREATE INDEX IF NOT EXISTS idx_detections_run ON detections(run_id);
+"""
+
+
+def to_timestamp(t):
+    """
+    Converte segundos epoch, str ISO, datetime ou UTCDateTime para segundos epoch (UTC).
+    """
+    if isinstance(t, (int, float)):
+        return float(t)
+    if isinstance(t, str):
+        t = datetime.fromisoformat(t.rstrip('Z'))
+    if isinstance(t, datetime):
+        if t.tzinfo is None:
+            t = t.replace(tzinfo=timezone.utc)
+        return t.timestamp()
+    # UTCDateTime do ObsPy
+    return float(t.timestamp)
+
+
+def open_results_store(path):
+    """
+    Abre (criando se necessário) o banco de resultados.
+
+    Parâmetros:
+    - path: arquivo SQLite (':memory:' para um banco temporário)
+
+    Retorna:
+    - conn: conexão sqlite3
+    """
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    if path != ':memory:':
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(_SCHEMA)
+
+    # Bancos criados antes da coluna config_hash
+    columns = {row['name'] for row in conn.execute("PRAGMA table_info(sources)")}
+    if 'config_hash' not in columns:
+        conn.execute("ALTER TABLE sources ADD COLUMN config_hash TEXT")
+    return conn
+
+
+def file_checksum(path, block_size=1 << 20):
+    """
+    SHA-1 do conteúdo de um arquivo, lido em blocos.
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _config_hash(params):
+    params_json = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(params_json.encode()).hexdigest(), params_json
+
+
+def _configs_hash(filters):
+    """
+    Hash do conjunto de configurações de filtro usadas num arquivo.
+    """
+    hashes = sorted({_config_hash(params)[0] for params in filters})
+    return hashlib.sha1(','.join(hashes).encode()).hexdigest()
+
+
+def filter_config_id(conn, params):
+    """
+    Identificador da configuração de filtro (dicionário de parâmetros).
+
+    Configurações iguais compartilham o mesmo registro.
+    """
+    config_hash, params_json = _config_hash(params)
+    conn.execute("INSERT OR IGNORE INTO filter_configs (config_hash, params) VALUES (?, ?)",
+                 (config_hash, params_json))
+    row = conn.execute("SELECT id FROM filter_configs WHERE config_hash = ?", (config_hash,)).fetchone()
+    return row['id']
+
+
+def source_is_current(conn, path, checksum, filters):
+    """
+    Indica se o arquivo já foi processado com o mesmo conteúdo e os mesmos filtros.
+
+    Parâmetros:
+    - path: identificador do arquivo de origem (como em store_results)
+    - checksum: conteúdo atual do arquivo (ex.: file_checksum)
+    - filters: lista das configurações de filtro ('filter' de cada resultado)
+    """
+    row = conn.execute("SELECT checksum, config_hash FROM sources WHERE path = ?", (path,)).fetchone()
+    return (row is not None and checksum is not None and row['checksum'] == checksum
+            and row['config_hash'] == _configs_hash(filters))
+
+
+def store_results(conn, source_path, results, checksum=None):
+    """
+    Grava (ou substitui) os resultados de um arquivo processado.
+
+    Os resultados anteriores do mesmo arquivo são removidos e os novos são
+    inseridos em lote numa única transação, de modo que reprocessar um arquivo
+    atualiza o banco sem duplicar linhas.
+
+    Parâmetros:
+    - conn: conexão aberta por open_results_store
+    - source_path: identificador do arquivo de origem
+    - results: lista de dicionários com 'station', 'channel', 'starttime',
+      'endtime', 'filter' (parâmetros), 'metrics' (saída de calculate_metrics)
+      e, opcionalmente, 'network' e 'detections' (lista de {'time', 'value', ...})
+    - checksum: conteúdo do arquivo (ex.: file_checksum); junto com as
+      configurações de filtro, permite pular arquivos já processados
+      (source_is_current)
+
+    Retorna:
+    - número de execuções gravadas
+    """
+    with conn:
+        conn.execute("DELETE FROM sources WHERE path = ?", (source_path,))
+        source_id = conn.execute(
+            "INSERT INTO sources (path, checksum, config_hash, processed_at) VALUES (?, ?, ?, ?)",
+            (source_path, checksum, _configs_hash(r['filter'] for r in results), time.time())).lastrowid
+
+        for result in results:
+            config_id = filter_config_id(conn, result['filter'])
+            run_id = conn.execute(
+                "INSERT INTO runs (source_id, config_id, network, station, channel, starttime, endtime) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (source_id, config_id, result.get('network'), result['station'], result['channel'],
+                 to_timestamp(result['starttime']), to_timestamp(result['endtime']))).lastrowid
+
+            conn.executemany(
+                "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                [(run_id, name, float(value)) for name, value in result['metrics'].items()
+                 if isinstance(value, numbers.Real)])
+
+            detections = result.get('detections', [])
+            conn.executemany(
+                "INSERT INTO detections (run_id, station, channel, time, value, attributes) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, result['station'], result['channel'], to_timestamp(det['time']),
+                  None if det.get('value') is None else float(det['value']),
+                  json.dumps({k: v for k, v in det.items() if k not in ('time', 'value')}, default=float))
+                 for det in detections])
+
+    return len(results)
+
+
+def _where(station, channel, starttime, endtime, time_column, prefix):
+    clauses, args = [], []
+    if station is not None:
+        clauses.append(f"{prefix}.station = ?")
+        args.append(station)
+    if channel is not None:
+        clauses.append(f"{prefix}.channel = ?")
+        args.append(channel)
+    if starttime is not None:
+        clauses.append(f"{prefix}.{time_column} >= ?")
+        args.append(to_timestamp(starttime))
+    if endtime is not None:
+        clauses.append(f"{prefix}.{time_column} < ?")
+        args.append(to_timestamp(endtime))
+    return clauses, args
+
+
+def query_detections(conn, station=None, channel=None, starttime=None, endtime=None,
+                     metric=None, min_value=None, filter_params=None):
+    """
+    Consulta detecções por estação, canal, intervalo de tempo e métrica da execução.
+
+    Exemplo: detecções da estação X em março com melhoria de SNR > 10 dB:
+    query_detections(conn, 'X', starttime='2011-03-01', endtime='2011-04-01',
+                     metric='SNR_improvement_dB', min_value=10)
+
+    Retorna:
+    - lista de dicionários (time, value, station, channel, network, run_id, attributes)
+    """
+    clauses, args = _where(station, channel, starttime, endtime, 'time', 'd')
+    joins = "JOIN runs r ON r.id = d.run_id"
+
+    if metric is not None:
+        joins += " JOIN metrics m ON m.run_id = d.run_id AND m.name = ?"
+        args.insert(0, metric)
+        if min_value is not None:
+            clauses.append("m.value > ?")
+            args.append(min_value)
+    if filter_params is not None:
+        clauses.append("r.config_id = (SELECT id FROM filter_configs WHERE config_hash = ?)")
+        args.append(_config_hash(filter_params)[0])
+
+    sql = ("SELECT d.time, d.value, d.station, d.channel, r.network, d.run_id, d.attributes "
+           f"FROM detections d {joins}")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY d.time"
+
+    rows = conn.execute(sql, args).fetchall()
+    return [dict(row, attributes=json.loads(row['attributes'] or '{}')) for row in rows]
+
+
+def query_metrics(conn, station=None, channel=None, starttime=None, endtime=None, names=None):
+    """
+    Consulta as métricas das execuções que começam no intervalo dado.
+
+    Retorna:
+    - lista de dicionários com os dados da execução e suas métricas em 'metrics'
+    """
+    clauses, args = _where(station, channel, starttime, endtime, 'starttime', 'r')
+    sql = ("SELECT r.id, r.network, r.station, r.channel, r.starttime, r.endtime, f.params "
+           "FROM runs r JOIN filter_configs f ON f.id = r.config_id")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY r.starttime"
+
+    runs = []
+    for row in conn.execute(sql, args).fetchall():
+        metric_rows = conn.execute("SELECT name, value FROM metrics WHERE run_id = ?", (row['id'],))
+        metrics = {m['name']: m['value'] for m in metric_rows if names is None or m['name'] in names}
+        runs.append({
+            'run_id': row['id'],
+            'network': row['network'],
+            'station': row['station'],
+            'channel': row['channel'],
+            'starttime': row['starttime'],
+            'endtime': row['endtime'],
+            'filter': json.loads(row['params']),
+            'metrics': metrics,
+        })
+    return runs
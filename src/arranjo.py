@@ -0,0 +1,170 @@
+"""
+Módulo para processamento de arranjos (beamforming e empilhamento) de traços filtrados.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def station_offsets_km(latitudes, longitudes, ref_lat=None, ref_lon=None):
+    """
+    Converte coordenadas geográficas em posições locais (km) no plano.
+
+    Parâmetros:
+    - latitudes, longitudes: coordenadas das estações (graus)
+    - ref_lat, ref_lon: origem do sistema local (padrão: centro do arranjo)
+
+    Retorna:
+    - coords: array (n_estações, 2) com (leste, norte) em km
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    lat0 = np.radians(ref_lat) if ref_lat is not None else lat.mean()
+    lon0 = np.radians(ref_lon) if ref_lon is not None else lon.mean()
+
+    east = EARTH_RADIUS_KM * (lon - lon0) * np.cos(lat0)
+    north = EARTH_RADIUS_KM * (lat - lat0)
+    return np.column_stack((east, north))
+
+
+def slowness_grid(s_max, n_points=41):
+    """
+    Grade regular de vagarosidade em cada direção (s/km), de -s_max a s_max.
+    """
+    s = np.linspace(-s_max, s_max, n_points)
+    return s, s.copy()
+
+
+def _beam_power_windows(segments, taper, band, steering):
+    """
+    Potência do feixe e potência total para um bloco de janelas.
+
+    segments é uma vista (n_estações, n_janelas, nwin) dos traços, band a fatia
+    de frequências da FFT usada no feixe e steering (n_freqs, n_grade,
+    n_estações) os vetores de direção de cada frequência da banda.
+    """
+    segments = segments - segments.mean(axis=-1, keepdims=True)
+    spectra = np.fft.rfft(segments * taper, axis=-1)[:, :, band]
+
+    power = np.zeros((steering.shape[1], spectra.shape[1]))
+    for k in range(steering.shape[0]):
+        beam = steering[k] @ spectra[:, :, k]
+        power += beam.real**2 + beam.imag**2
+
+    total = spectra.shape[0] * np.sum(spectra.real**2 + spectra.imag**2, axis=(0, 2))
+    return power, total
+
+
+def frequency_beam_power(traces, fs, coords, sx, sy, fmin, fmax, win_len, step=None,
+                         window='hann', windows_per_chunk=32, max_workers=None):
+    """
+    Beamforming delay-and-sum no domínio da frequência em janelas deslizantes.
+
+    As janelas são divididas em blocos processados em threads: cada bloco
+    remove a média, aplica a janela, calcula a FFT e soma o feixe, de modo
+    que a memória usada depende do tamanho do bloco e não da duração do
+    registro. A FFT de cada janela é reutilizada em todos os pontos da grade
+    de vagarosidade, e os vetores de direção de cada frequência são
+    calculados uma única vez.
+
+    Parâmetros:
+    - traces: array (n_estações, n) de traços filtrados e alinhados no tempo
+      (ex.: saídas de butter_bandpass_filter ou apply_fir_filter)
+    - fs: frequência de amostragem (Hz)
+    - coords: posições (leste, norte) das estações em km (station_offsets_km)
+    - sx, sy: eixos da grade de vagarosidade (s/km)
+    - fmin, fmax: banda de frequências somada no feixe (Hz)
+    - win_len: duração da janela (s)
+    - step: passo entre janelas (s); padrão: metade da janela
+    - window: janela aplicada a cada trecho antes da FFT
+    - windows_per_chunk: janelas processadas por bloco
+    - max_workers: número máximo de threads
+
+    Retorna:
+    - dicionário com 'times' (centro das janelas, s), 'power' (potência
+      relativa, forma (n_janelas, len(sy), len(sx)), entre 0 e 1),
+      'slowness' (sx, sy do máximo por janela), 'back_azimuth' (graus) e
+      'apparent_velocity' (km/s)
+    """
+    traces = np.asarray(np.ma.filled(traces, 0.0), dtype=float)
+    coords = np.asarray(coords, dtype=float)
+    nwin = int(round(win_len * fs))
+    nstep = int(round(step * fs)) if step is not None else max(nwin // 2, 1)
+    if traces.shape[-1] < nwin:
+        raise ValueError("Traços mais curtos que uma janela")
+
+    freqs = np.fft.rfftfreq(nwin, d=1/fs)
+    in_band = np.flatnonzero((freqs >= fmin) & (freqs <= fmax))
+    if len(in_band) == 0:
+        raise ValueError("Nenhuma frequência da FFT dentro da banda escolhida")
+    band = slice(in_band[0], in_band[-1] + 1)
+
+    # Atraso de cada estação para cada ponto da grade: s . r (s)
+    gx, gy = np.meshgrid(sx, sy)
+    delays = np.outer(gx.ravel(), coords[:, 0]) + np.outer(gy.ravel(), coords[:, 1])
+    # Vetores de direção por frequência, compartilhados por todos os blocos
+    steering = np.exp(2j * np.pi * freqs[band, None, None] * delays)
+
+    # Vista (sem cópia) de todas as janelas; cada bloco copia apenas a sua parte
+    segments = sliding_window_view(traces, nwin, axis=-1)[:, ::nstep]
+    taper = get_window(window, nwin)
+    n_windows = segments.shape[1]
+    starts = range(0, n_windows, windows_per_chunk)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parts = list(executor.map(
+            lambda i: _beam_power_windows(segments[:, i:i + windows_per_chunk], taper, band, steering),
+            starts))
+    power = np.concatenate([p for p, _ in parts], axis=1)
+    total = np.concatenate([t for _, t in parts])
+
+    # Normaliza pela potência total: 1 corresponde a coerência perfeita
+    power = (power / np.maximum(total, np.finfo(float).tiny)).T.reshape(n_windows, len(sy), len(sx))
+
+    best = power.reshape(n_windows, -1).argmax(axis=1)
+    best_sx, best_sy = gx.ravel()[best], gy.ravel()[best]
+    s_abs = np.hypot(best_sx, best_sy)
+
+    return {
+        'times': (np.arange(n_windows) * nstep + nwin / 2) / fs,
+        'power': power,
+        'slowness': np.column_stack((best_sx, best_sy)),
+        'back_azimuth': (np.degrees(np.arctan2(best_sx, best_sy)) + 180) % 360,
+        'apparent_velocity': np.where(s_abs > 0, 1 / np.maximum(s_abs, np.finfo(float).tiny), np.inf),
+    }
+
+
+def delay_and_sum(traces, fs, coords, slowness):
+    """
+    Empilha os traços alinhados para um vetor de vagarosidade (feixe no tempo).
+
+    Os atrasos fracionários são aplicados no domínio da frequência.
+
+    Parâmetros:
+    - traces: array (n_estações, n) de traços filtrados
+    - fs: frequência de amostragem (Hz)
+    - coords: posições (leste, norte) das estações em km
+    - slowness: vetor (sx, sy) em s/km
+
+    Retorna:
+    - beam: traço empilhado (média das estações), com n amostras
+    """
+    traces = np.ma.filled(traces, 0.0).astype(float)
+    coords = np.asarray(coords, dtype=float)
+    n = traces.shape[-1]
+
+    delays = coords @ np.asarray(slowness, dtype=float)
+    # Zeros suficientes para o maior atraso não dar a volta no sinal
+    pad = int(np.ceil(np.max(np.abs(delays)) * fs)) + 1
+    nfft = 1 << int(np.ceil(np.log2(n + pad)))
+
+    spectra = np.fft.rfft(traces, n=nfft, axis=-1)
+    freqs = np.fft.rfftfreq(nfft, d=1/fs)
+    shifted = spectra * np.exp(2j * np.pi * np.outer(delays, freqs))
+    return np.fft.irfft(shifted.mean(axis=0), n=nfft)[:n]
@@ -5,11 +5,51 @@ Módulo para cálculo de métricas de desempenho.
 import numpy as np
 from scipy.signal import find_peaks
 
+from src.espectro import band_energy_ratio
 
-def calculate_metrics(original, filtered, clean_signal=None, fs=1.0, lowcut=None, highcut=None):
+
+def _valid_samples(original, filtered, clean_signal=None):
+    """
+    Remove as amostras mascaradas em qualquer um dos sinais.
+    """
+    signals = [s for s in (original, filtered, clean_signal) if s is not None]
+    if not any(np.ma.isMaskedArray(s) for s in signals):
+        return original, filtered, clean_signal
+
+    invalid = np.zeros(len(original), dtype=bool)
+    for s in signals:
+        invalid |= np.ma.getmaskarray(s)
+
+    valid = [np.ma.getdata(s)[~invalid] for s in signals]
+    if clean_signal is None:
+        valid.append(None)
+    return tuple(valid)
+
+
+def detect_peaks(data, fs=1.0):
+    """
+    Detecta picos de amplitude acima de um desvio padrão.
+
+    Retorna:
+    - índices dos picos
+    """
+    peaks, _ = find_peaks(np.abs(data), height=np.std(data), distance=max(int(fs/10), 1))
+    return peaks
+
+
+def calculate_metrics(original, filtered, clean_signal=None, fs=1.0, lowcut=None, highcut=None,
+                      spectra=None):
     """
     Calcula métricas quantitativas de desempenho do filtro.
+
+    Se spectra = (freqs, psd_original, psd_filtered) for fornecido (ex.: PSDs
+    de Welch de src.espectro), a razão de energia usa esses espectros em vez
+    de uma FFT do registro inteiro.
+
+    Sinais mascarados (np.ma.MaskedArray, ex.: traços com lacunas) são
+    avaliados apenas nas amostras válidas em todos os sinais.
     """
+    original, filtered, clean_signal = _valid_samples(original, filtered, clean_signal)
     metrics = {}
     
     # 1. SNR (Signal-to-Noise Ratio) - se tiver sinal limpo
@@ -45,26 +85,21 @@ def calculate_metrics(original, filtered, clean_signal=None, fs=1.0, lowcut=None
         metrics['Correlation_filtered'] = corr_coef_filtered
     
     # 4. Energy Ratio (banda de interesse vs banda total)
-    fft_original = np.abs(np.fft.rfft(original))
-    fft_filtered = np.abs(np.fft.rfft(filtered))
-    freqs = np.fft.rfftfreq(len(original), d=1/fs)
-    
     if lowcut is not None and highcut is not None:
-        freq_mask_interest = (freqs >= lowcut) & (freqs <= highcut)
-        freq_mask_outside = ~freq_mask_interest
-        
-        energy_original_interest = np.sum(fft_original[freq_mask_interest]**2)
-        energy_original_outside = np.sum(fft_original[freq_mask_outside]**2)
-        energy_filtered_interest = np.sum(fft_filtered[freq_mask_interest]**2)
-        energy_filtered_outside = np.sum(fft_filtered[freq_mask_outside]**2)
+        if spectra is not None:
+            freqs, power_original, power_filtered = spectra
+        else:
+            freqs = np.fft.rfftfreq(len(original), d=1/fs)
+            power_original = np.abs(np.fft.rfft(original))**2
+            power_filtered = np.abs(np.fft.rfft(filtered))**2
         
-        metrics['Energy_ratio_original'] = energy_original_interest / (energy_original_outside + 1e-10)
-        metrics['Energy_ratio_filtered'] = energy_filtered_interest / (energy_filtered_outside + 1e-10)
+        metrics['Energy_ratio_original'] = band_energy_ratio(freqs, power_original, lowcut, highcut)
+        metrics['Energy_ratio_filtered'] = band_energy_ratio(freqs, power_filtered, lowcut, highcut)
         metrics['Energy_ratio_improvement'] = metrics['Energy_ratio_filtered'] / metrics['Energy_ratio_original']
     
     # 5. Peak Detection Metrics
-    peaks_original, _ = find_peaks(np.abs(original), height=np.std(original), distance=int(fs/10))
-    peaks_filtered, _ = find_peaks(np.abs(filtered), height=np.std(filtered), distance=int(fs/10))
+    peaks_original = detect_peaks(original, fs)
+    peaks_filtered = detect_peaks(filtered, fs)
     
     metrics['Peaks_detected_original'] = len(peaks_original)
     metrics['Peaks_detected_filtered'] = len(peaks_filtered)
@@ -0,0 +1,263 @@
+"""
+Módulo para download em lote de formas de onda via FDSN dataselect.
+"""
+
+import http.client
+import os
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+
+
+DEFAULT_BASE_URL = "https://service.iris.edu"
+DATASELECT_PATH = "/fdsnws/dataselect/1/query"
+
+
+def _to_datetime(t):
+    """
+    Converte str ISO, datetime ou UTCDateTime do ObsPy para datetime UTC.
+    """
+    if hasattr(t, 'datetime'):
+        t = t.datetime
+    if isinstance(t, str):
+        t = datetime.fromisoformat(t.rstrip('Z'))
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.astimezone(timezone.utc)
+
+
+def _format_time(t):
+    return t.strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+def _day_start(t):
+    return datetime(t.year, t.month, t.day, tzinfo=timezone.utc)
+
+
+def split_into_day_chunks(starttime, endtime):
+    """
+    Divide o intervalo [starttime, endtime) nos limites de dia (UTC).
+
+    Retorna:
+    - lista de pares (início, fim) em datetime UTC
+    """
+    start = _to_datetime(starttime)
+    end = _to_datetime(endtime)
+
+    chunks = []
+    while start < end:
+        next_day = _day_start(start) + timedelta(days=1)
+        chunk_end = min(next_day, end)
+        chunks.append((start, chunk_end))
+        start = chunk_end
+    return chunks
+
+
+def _seconds_label(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}{seconds // 60 % 60:02d}{seconds % 60:02d}"
+
+
+def cache_path(cache_dir, network, station, location, channel, starttime, endtime=None):
+    """
+    Caminho do arquivo de um bloco no cache de formas de onda.
+
+    Layout: cache_dir/REDE/ESTACAO/REDE.ESTACAO.LOC.CANAL.AAAA.DDD.mseed para
+    um dia UTC completo; blocos parciais acrescentam o intervalo do dia
+    (ex.: ...AAAA.DDD.050000-060000.mseed), para que pedidos de horas
+    diferentes do mesmo dia não compartilhem o arquivo.
+    """
+    t = _to_datetime(starttime)
+    day = _day_start(t)
+    filename = f"{network}.{station}.{location}.{channel}.{t.year:04d}.{t.timetuple().tm_yday:03d}"
+
+    if endtime is not None:
+        end = _to_datetime(endtime)
+        if t != day or end != day + timedelta(days=1):
+            start_s = (t - day).total_seconds()
+            end_s = (end - day).total_seconds()
+            filename += f".{_seconds_label(start_s)}-{_seconds_label(end_s)}"
+
+    return os.path.join(cache_dir, network, station, filename + ".mseed")
+
+
+def build_chunk_requests(requests, cache_dir):
+    """
+    Expande pedidos (rede, estação, local, canal, início, fim) em blocos diários.
+
+    Blocos repetidos são descartados, assim como blocos parciais de um dia
+    que também é pedido por inteiro.
+
+    Retorna:
+    - lista de blocos {'network', 'station', 'location', 'channel',
+      'starttime', 'endtime', 'path', 'day_path'}
+    """
+    chunks = {}
+    for network, station, location, channel, starttime, endtime in requests:
+        for chunk_start, chunk_end in split_into_day_chunks(starttime, endtime):
+            path = cache_path(cache_dir, network, station, location, channel, chunk_start, chunk_end)
+            chunks.setdefault(path, {
+                'network': network,
+                'station': station,
+                'location': location,
+                'channel': channel,
+                'starttime': chunk_start,
+                'endtime': chunk_end,
+                'path': path,
+                'day_path': cache_path(cache_dir, network, station, location, channel, chunk_start),
+            })
+
+    return [chunk for chunk in chunks.values()
+            if chunk['path'] == chunk['day_path'] or chunk['day_path'] not in chunks]
+
+
+def chunk_status(chunk, refresh_nodata=False):
+    """
+    Estado de um bloco no cache: 'done', 'nodata' ou 'missing'.
+
+    Um bloco parcial está completo se o arquivo do dia inteiro existir.
+    Arquivos '.part' de execuções interrompidas não contam como baixados.
+    Com refresh_nodata=True, blocos marcados sem dados contam como 'missing'
+    e são consultados de novo (ex.: dados publicados depois).
+    """
+    for path in (chunk['path'], chunk['day_path']):
+        if os.path.exists(path):
+            return 'done'
+    if not refresh_nodata:
+        for path in (chunk['path'], chunk['day_path']):
+            if os.path.exists(path + '.nodata'):
+                return 'nodata'
+    return 'missing'
+
+
+def _query_url(chunk, base_url):
+    params = {
+        'net': chunk['network'],
+        'sta': chunk['station'],
+        'loc': chunk['location'] or '--',
+        'cha': chunk['channel'],
+        'start': _format_time(chunk['starttime']),
+        'end': _format_time(chunk['endtime']),
+    }
+    return base_url.rstrip('/') + DATASELECT_PATH + '?' + urllib.parse.urlencode(params)
+
+
+def fetch_chunk(chunk, base_url=DEFAULT_BASE_URL, retries=4, backoff=1.0, timeout=120):
+    """
+    Baixa um bloco diário diretamente para o cache.
+
+    O arquivo é escrito em '.part' e renomeado ao final, de modo que um
+    download interrompido nunca é confundido com um bloco completo. Somente a
+    resposta sem dados do padrão FDSN (204) gera um marcador '.nodata'; um
+    404 (URL errada, proxy) é erro e não marca o bloco. Erros de servidor e de
+    rede, inclusive conexões encerradas no meio do corpo (tamanho diferente
+    de Content-Length), são repetidos com espera exponencial. Se todas as
+    tentativas falharem, o '.part' é removido.
+
+    Retorna:
+    - (status, n_bytes) com status 'downloaded' ou 'nodata'
+    """
+    url = _query_url(chunk, base_url)
+    os.makedirs(os.path.dirname(chunk['path']), exist_ok=True)
+    part_path = chunk['path'] + '.part'
+
+    for attempt in range(retries + 1):
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                if response.status == 204:
+                    open(chunk['path'] + '.nodata', 'w').close()
+                    return 'nodata', 0
+
+                expected = response.headers.get('Content-Length')
+                n_bytes = 0
+                with open(part_path, 'wb') as f:
+                    while True:
+                        block = response.read(1 << 16)
+                        if not block:
+                            break
+                        f.write(block)
+                        n_bytes += len(block)
+
+            # Conexão encerrada antes do fim do corpo: trata como falha de rede
+            if expected is not None and n_bytes != int(expected):
+                raise http.client.IncompleteRead(b'', int(expected) - n_bytes)
+
+            os.replace(part_path, chunk['path'])
+            _discard(chunk['path'] + '.nodata')
+            return 'downloaded', n_bytes
+
+        except urllib.error.HTTPError as e:
+            # Erros do cliente (exceto limite de requisições) não melhoram com nova tentativa
+            if (e.code < 500 and e.code != 429) or attempt == retries:
+                _discard(part_path)
+                raise
+        except (urllib.error.URLError, http.client.HTTPException, OSError):
+            if attempt == retries:
+                _discard(part_path)
+                raise
+
+        time.sleep(backoff * 2**attempt * (1 + random.random()))
+
+
+def _discard(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def bulk_download(requests, cache_dir, base_url=DEFAULT_BASE_URL, max_workers=4,
+                  retries=4, backoff=1.0, timeout=120, refresh_nodata=False, verbose=True):
+    """
+    Baixa pedidos de formas de onda em blocos diários, em paralelo.
+
+    Blocos já presentes no cache (ou marcados sem dados) são pulados, o que
+    permite retomar um arquivo parcialmente baixado.
+
+    Parâmetros:
+    - requests: lista de (rede, estação, local, canal, início, fim)
+    - cache_dir: diretório raiz do cache de formas de onda
+    - base_url: servidor FDSN (ex.: o servidor local de src.servidor_fdsn_local)
+    - max_workers: número máximo de downloads simultâneos
+    - retries, backoff, timeout: política de novas tentativas por bloco
+    - refresh_nodata: consulta de novo os blocos marcados sem dados
+
+    Retorna:
+    - summary: contagens ('downloaded', 'skipped', 'nodata'), 'failed'
+      (lista de (bloco, erro)), 'bytes' e 'elapsed' (s)
+    """
+    chunks = build_chunk_requests(requests, cache_dir)
+    summary = {'downloaded': 0, 'skipped': 0, 'nodata': 0, 'failed': [], 'bytes': 0}
+    t_start = time.perf_counter()
+
+    pending = []
+    for chunk in chunks:
+        if chunk_status(chunk, refresh_nodata) == 'missing':
+            pending.append(chunk)
+        else:
+            summary['skipped'] += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_chunk, chunk, base_url, retries, backoff, timeout): chunk
+            for chunk in pending
+        }
+        for future in as_completed(futures):
+            chunk = futures[future]
+            try:
+                status, n_bytes = future.result()
+            except Exception as e:
+                summary['failed'].append((chunk, e))
+                if verbose:
+                    print(f"  Falha: {os.path.basename(chunk['path'])} ({e})")
+                continue
+
+            summary[status] += 1
+            summary['bytes'] += n_bytes
+            if verbose:
+                print(f"  {status}: {os.path.basename(chunk['path'])} ({n_bytes} bytes)")
+
+    summary['elapsed'] = time.perf_counter() - t_start
+    return summary
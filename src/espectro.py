@@ -0,0 +1,298 @@
+"""
+Módulo para análise espectral incremental (Welch, espectrograma e PPSD).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import get_window
+
+
+def init_welch_state(fs, nperseg=4096, noverlap=None, window='hann', start_time=0.0):
+    """
+    Cria o estado de um estimador de Welch processado em blocos.
+
+    Parâmetros:
+    - fs: frequência de amostragem (Hz)
+    - nperseg: amostras por janela
+    - noverlap: sobreposição entre janelas (padrão: nperseg // 2)
+    - window: janela usada em cada segmento
+    - start_time: instante da primeira amostra (s), usado nos tempos das janelas
+
+    Retorna:
+    - state: dicionário com a configuração e os acumuladores
+    """
+    if noverlap is None:
+        noverlap = nperseg // 2
+    if not 0 <= noverlap < nperseg:
+        raise ValueError("noverlap deve estar entre 0 e nperseg - 1")
+
+    win = get_window(window, nperseg)
+    scale = np.ones(nperseg // 2 + 1) / (fs * np.sum(win**2))
+    # Espectro unilateral: dobra tudo exceto DC (e Nyquist, se existir)
+    scale[1:] *= 2
+    if nperseg % 2 == 0:
+        scale[-1] /= 2
+
+    return {
+        'fs': fs,
+        'nperseg': nperseg,
+        'step': nperseg - noverlap,
+        'window': win,
+        'scale': scale,
+        'freqs': np.fft.rfftfreq(nperseg, d=1/fs),
+        'start_time': start_time,
+        'buffer': np.zeros(0),
+        'buffer_start': 0,
+        'psd_sum': np.zeros(nperseg // 2 + 1),
+        'n_segments': 0,
+    }
+
+
+def welch_chunk(chunk, state):
+    """
+    Processa um bloco de amostras, calculando os espectros das janelas completas.
+
+    As amostras que ainda não completam uma janela ficam no estado para o
+    próximo bloco, de modo que o resultado não depende do tamanho dos blocos.
+
+    Parâmetros:
+    - chunk: próximo bloco do sinal
+    - state: estado criado por init_welch_state
+
+    Retorna:
+    - frames: {'times', 'psd'} com o centro e a PSD de cada janela do bloco
+    - state: estado atualizado
+    """
+    nperseg, step = state['nperseg'], state['step']
+    buffer = np.concatenate((state['buffer'], np.asarray(chunk, dtype=float)))
+
+    n_frames = (len(buffer) - nperseg) // step + 1 if len(buffer) >= nperseg else 0
+    if n_frames == 0:
+        state['buffer'] = buffer
+        return {'times': np.zeros(0), 'psd': np.zeros((0, len(state['freqs'])))}, state
+
+    segments = sliding_window_view(buffer, nperseg)[::step][:n_frames]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    psd = np.abs(np.fft.rfft(segments * state['window'], axis=1))**2 * state['scale']
+
+    first = state['buffer_start']
+    times = state['start_time'] + (first + np.arange(n_frames) * step + nperseg / 2) / state['fs']
+
+    consumed = n_frames * step
+    state['buffer'] = buffer[consumed:]
+    state['buffer_start'] = first + consumed
+    state['psd_sum'] = state['psd_sum'] + psd.sum(axis=0)
+    state['n_segments'] += n_frames
+
+    return {'times': times, 'psd': psd}, state
+
+
+def finalize_welch(state):
+    """
+    Retorna a PSD média acumulada (estimativa de Welch).
+
+    Retorna:
+    - freqs: vetor de frequências (Hz)
+    - psd: densidade espectral de potência média
+    """
+    if state['n_segments'] == 0:
+        raise ValueError("Nenhuma janela completa foi processada")
+    return state['freqs'], state['psd_sum'] / state['n_segments']
+
+
+def merge_welch_states(state_a, state_b):
+    """
+    Combina duas estimativas parciais de Welch com a mesma configuração.
+    """
+    if not np.array_equal(state_a['freqs'], state_b['freqs']):
+        raise ValueError("Estados de Welch com configurações diferentes")
+
+    merged = dict(state_a)
+    merged['psd_sum'] = state_a['psd_sum'] + state_b['psd_sum']
+    merged['n_segments'] = state_a['n_segments'] + state_b['n_segments']
+    return merged
+
+
+def _welch_state(data, fs, nperseg, noverlap, window, chunk_size):
+    """
+    Acumula as janelas de Welch de um sinal percorrendo-o em blocos.
+    """
+    state = init_welch_state(fs, nperseg, noverlap, window)
+    if chunk_size is None:
+        chunk_size = 64 * nperseg
+
+    for i in range(0, len(data), chunk_size):
+        _, state = welch_chunk(data[i:i + chunk_size], state)
+    return state
+
+
+def welch_psd(data, fs, nperseg=4096, noverlap=None, window='hann', chunk_size=None):
+    """
+    Calcula a PSD de Welch de um sinal percorrendo-o em blocos.
+
+    Parâmetros:
+    - data: sinal (pode ser um np.memmap de um registro longo)
+    - fs: frequência de amostragem (Hz)
+    - nperseg, noverlap, window: configuração das janelas
+    - chunk_size: amostras lidas por vez (padrão: 64 janelas)
+
+    Retorna:
+    - freqs, psd
+    """
+    nperseg = min(nperseg, len(data))
+    return finalize_welch(_welch_state(data, fs, nperseg, noverlap, window, chunk_size))
+
+
+def welch_psd_runs(data, runs, fs, nperseg=4096, noverlap=None, window='hann', chunk_size=None):
+    """
+    PSD de Welch de um traço com lacunas, sem janelas atravessando lacunas longas.
+
+    Cada trecho contíguo (ver assemble_segments) é processado separadamente
+    e as estimativas parciais são combinadas. Trechos mais curtos que uma
+    janela são ignorados.
+
+    Parâmetros:
+    - data: traço montado (np.ma.MaskedArray ou array)
+    - runs: trechos contíguos (i0, i1)
+    - fs, nperseg, noverlap, window, chunk_size: ver welch_psd
+
+    Retorna:
+    - freqs, psd
+    """
+    values = np.ma.getdata(data)
+    nperseg = min(nperseg, max(i1 - i0 for i0, i1 in runs))
+
+    merged = None
+    for i0, i1 in runs:
+        if i1 - i0 < nperseg:
+            continue
+        state = _welch_state(values[i0:i1], fs, nperseg, noverlap, window, chunk_size)
+        merged = state if merged is None else merge_welch_states(merged, state)
+
+    return finalize_welch(merged)
+
+
+def stream_spectrogram(chunks, fs, nperseg=4096, noverlap=None, window='hann', start_time=0.0):
+    """
+    Calcula o espectrograma de uma sequência de blocos.
+
+    Parâmetros:
+    - chunks: iterável de blocos consecutivos do sinal
+    - fs, nperseg, noverlap, window, start_time: ver init_welch_state
+
+    Retorna:
+    - freqs: vetor de frequências (Hz)
+    - times: centro de cada janela (s)
+    - Sxx: PSD de cada janela, forma (n_freqs, n_janelas)
+    - state: estado final (PSD média via finalize_welch)
+    """
+    state = init_welch_state(fs, nperseg, noverlap, window, start_time)
+    times, frames = [], []
+    for chunk in chunks:
+        frame, state = welch_chunk(chunk, state)
+        times.append(frame['times'])
+        frames.append(frame['psd'])
+
+    Sxx = np.concatenate(frames, axis=0).T if frames else np.zeros((len(state['freqs']), 0))
+    times = np.concatenate(times) if times else np.zeros(0)
+    return state['freqs'], times, Sxx, state
+
+
+def band_energy_ratio(freqs, psd, lowcut, highcut):
+    """
+    Razão entre a energia na banda de interesse e fora dela.
+    """
+    in_band = (freqs >= lowcut) & (freqs <= highcut)
+    return np.sum(psd[in_band]) / (np.sum(psd[~in_band]) + 1e-10)
+
+
+def init_noise_histogram(freqs, db_min=-100.0, db_max=150.0, db_step=1.0):
+    """
+    Cria um histograma de PSD por frequência (estilo PPSD).
+
+    Parâmetros:
+    - freqs: frequências das PSDs acumuladas (Hz)
+    - db_min, db_max, db_step: grade de níveis em dB
+
+    Retorna:
+    - hist: {'freqs', 'db_edges', 'counts'} com counts de forma (n_freqs, n_bins)
+    """
+    db_edges = np.arange(db_min, db_max + db_step, db_step)
+    return {
+        'freqs': np.asarray(freqs),
+        'db_edges': db_edges,
+        'counts': np.zeros((len(freqs), len(db_edges) - 1), dtype=np.int64),
+    }
+
+
+def update_noise_histogram(hist, segment_psds):
+    """
+    Acumula as PSDs de janelas (forma (n_janelas, n_freqs)) no histograma.
+    """
+    segment_psds = np.atleast_2d(segment_psds)
+    if segment_psds.size == 0:
+        return hist
+
+    n_freqs, n_bins = hist['counts'].shape
+    psd_db = 10 * np.log10(np.maximum(segment_psds, 1e-30))
+    bins = np.clip(np.searchsorted(hist['db_edges'], psd_db, side='right') - 1, 0, n_bins - 1)
+
+    # Índice linear (frequência, nível) para contar tudo de uma vez
+    flat = np.arange(n_freqs) * n_bins + bins
+    hist['counts'] += np.bincount(flat.ravel(), minlength=n_freqs * n_bins).reshape(n_freqs, n_bins)
+    return hist
+
+
+def merge_noise_histograms(hist_a, hist_b):
+    """
+    Soma dois histogramas parciais com a mesma grade.
+    """
+    if hist_a['counts'].shape != hist_b['counts'].shape:
+        raise ValueError("Histogramas com grades diferentes")
+
+    merged = dict(hist_a)
+    merged['counts'] = hist_a['counts'] + hist_b['counts']
+    return merged
+
+
+def noise_percentiles(hist, percentiles=(5, 50, 95)):
+    """
+    Calcula percentis do nível de ruído (dB) por frequência.
+
+    Retorna:
+    - array de forma (len(percentiles), n_freqs); NaN onde não há dados
+    """
+    counts = hist['counts']
+    centers = 0.5 * (hist['db_edges'][:-1] + hist['db_edges'][1:])
+    cumulative = np.cumsum(counts, axis=1)
+    total = cumulative[:, -1]
+
+    result = np.full((len(percentiles), counts.shape[0]), np.nan)
+    for i, p in enumerate(percentiles):
+        target = total * p / 100.0
+        idx = np.argmax(cumulative >= target[:, None], axis=1)
+        result[i] = np.where(total > 0, centers[idx], np.nan)
+    return result
+
+
+def accumulate_station_day(histograms, station, freqs, frames, **hist_kwargs):
+    """
+    Distribui as PSDs de janelas nos histogramas por estação e dia.
+
+    Parâmetros:
+    - histograms: dicionário {(station, dia): hist}, atualizado no lugar
+    - station: código da estação
+    - freqs: frequências das PSDs (Hz)
+    - frames: saída de welch_chunk, com 'times' em segundos UTC (epoch)
+    - hist_kwargs: grade em dB repassada a init_noise_histogram
+
+    Retorna:
+    - histograms
+    """
+    days = np.floor(frames['times'] / 86400.0).astype(np.int64)
+    for day in np.unique(days):
+        key = (station, int(day))
+        if key not in histograms:
+            histograms[key] = init_noise_histogram(freqs, **hist_kwargs)
+        update_noise_histogram(histograms[key], frames['psd'][days == day])
+    return histograms
@@ -3,7 +3,7 @@ Módulo para projeto e aplicação de filtros digitais.
 """
 
 import numpy as np
-from scipy.signal import butter, lfilter, freqz, group_delay, firwin, remez, kaiserord, firwin2, filtfilt
+from scipy.signal import butter, lfilter, sosfilt, freqz, group_delay, firwin, remez, kaiserord, firwin2, filtfilt
 
 
 def butter_bandpass(lowcut, highcut, fs, order=4):
@@ -25,12 +25,28 @@ def butter_bandpass(lowcut, highcut, fs, order=4):
     return b, a
 
 
+def butter_bandpass_sos(lowcut, highcut, fs, order=4):
+    """
+    Projeta filtro IIR Butterworth passa-faixa em seções de segunda ordem.
+    
+    Numericamente estável mesmo com cortes muito abaixo de fs (ex.: 0.05 Hz
+    a 100 Hz), onde a forma (b, a) pode ter polos fora do círculo unitário.
+    
+    Retorna:
+    - sos: seções de segunda ordem, forma (n_seções, 6)
+    """
+    nyq = 0.5 * fs
+    low = lowcut / nyq
+    high = highcut / nyq
+    return butter(order, [low, high], btype='band', output='sos')
+
+
 def butter_bandpass_filter(data, lowcut, highcut, fs, order=4):
     """
-    Aplica filtro Butterworth passa-faixa.
+    Aplica filtro Butterworth passa-faixa (em seções de segunda ordem).
     """
-    b, a = butter_bandpass(lowcut, highcut, fs, order=order)
-    y = lfilter(b, a, data)
+    sos = butter_bandpass_sos(lowcut, highcut, fs, order=order)
+    y = sosfilt(sos, data)
     return y
 
 
@@ -0,0 +1,184 @@
+"""
+Módulo para montagem de traços com lacunas e sobreposições antes da filtragem.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.signal import lfilter, lfilter_zi, sosfilt, sosfilt_zi
+
+from src.reamostragem import resample_signal
+
+
+def segments_from_stream(st, channel=None):
+    """
+    Extrai os segmentos de um Stream do ObsPy.
+
+    Parâmetros:
+    - st: Stream lido com obspy.read
+    - channel: código do canal a selecionar (ex.: 'BHZ'); None usa todos
+
+    Retorna:
+    - lista de segmentos {'start', 'fs', 'data'} ordenada pelo início
+    """
+    if channel is not None:
+        st = st.select(channel=channel)
+
+    segments = [
+        {
+            'start': float(tr.stats.starttime.timestamp),
+            'fs': float(tr.stats.sampling_rate),
+            'data': np.asarray(tr.data, dtype=float),
+        }
+        for tr in st
+    ]
+    return sorted(segments, key=lambda seg: seg['start'])
+
+
+def assemble_segments(segments, fs=None, max_fill_gap=1.0):
+    """
+    Monta um traço contínuo a partir de segmentos com lacunas e sobreposições.
+
+    Cada segmento é posicionado numa grade comum de amostragem. Nas
+    sobreposições prevalecem as amostras do segmento anterior. Lacunas de até
+    max_fill_gap segundos são preenchidas por interpolação linear (o filtro
+    atravessa a lacuna mantendo o estado); lacunas maiores interrompem o
+    trecho contíguo. Amostras preenchidas ou ausentes ficam mascaradas.
+
+    Parâmetros:
+    - segments: lista de segmentos {'start', 'fs', 'data'}
+    - fs: frequência de amostragem da grade (Hz); None usa a do primeiro segmento
+    - max_fill_gap: maior lacuna preenchida (s)
+
+    Retorna:
+    - data: np.ma.MaskedArray com o traço montado
+    - runs: lista de trechos contíguos (i0, i1) a filtrar
+    - gaps: lista de lacunas {'start', 'end', 'duration', 'type'} com type
+      'overlap', 'short' ou 'long'
+    """
+    # Segmentos vazios não definem o início nem a posição das lacunas
+    segments = sorted((seg for seg in segments if len(seg['data']) > 0), key=lambda seg: seg['start'])
+    if not segments:
+        raise ValueError("Nenhum segmento para montar")
+
+    if fs is None:
+        fs = segments[0]['fs']
+
+    t0 = segments[0]['start']
+    placed = []
+    for seg in segments:
+        seg_data = seg['data']
+        if seg['fs'] != fs:
+            seg_data = resample_signal(seg_data, seg['fs'], fs)
+        offset = int(round((seg['start'] - t0) * fs))
+        placed.append((offset, seg_data))
+
+    n_total = max(offset + len(seg_data) for offset, seg_data in placed)
+    values = np.zeros(n_total)
+    mask = np.ones(n_total, dtype=bool)
+
+    runs = []
+    gaps = []
+    run_start = 0
+    prev_end = None
+
+    for offset, seg_data in placed:
+        end = offset + len(seg_data)
+        if prev_end is None:
+            run_start = offset
+            prev_end = offset
+
+        if offset != prev_end:
+            gap_info = {
+                'start': t0 + prev_end / fs,
+                'end': t0 + offset / fs,
+                'duration': (offset - prev_end) / fs,
+            }
+            if offset < prev_end:
+                gap_info['type'] = 'overlap'
+            elif gap_info['duration'] <= max_fill_gap:
+                gap_info['type'] = 'short'
+                # Interpolação linear entre a última amostra e a próxima
+                values[prev_end:offset] = np.interp(
+                    np.arange(prev_end, offset), [prev_end - 1, offset],
+                    [values[prev_end - 1], seg_data[0]])
+            else:
+                gap_info['type'] = 'long'
+                runs.append((run_start, prev_end))
+                run_start = offset
+            gaps.append(gap_info)
+
+        # Nas sobreposições mantém as amostras já posicionadas
+        new_start = max(offset, prev_end)
+        if end > new_start:
+            values[new_start:end] = seg_data[new_start - offset:]
+            mask[new_start:end] = False
+        prev_end = max(prev_end, end)
+
+    runs.append((run_start, prev_end))
+    runs = [(i0, i1) for i0, i1 in runs if i1 > i0]
+
+    return np.ma.MaskedArray(values, mask=mask), runs, gaps
+
+
+def filter_segments(data, runs, b=None, a=None, sos=None, steady_state=True, max_workers=None):
+    """
+    Filtra cada trecho contíguo de forma independente e em paralelo.
+
+    Lacunas longas não são atravessadas pelo filtro IIR, evitando os
+    transientes que surgiriam ao filtrar o traço concatenado.
+
+    Parâmetros:
+    - data: traço montado (np.ma.MaskedArray) por assemble_segments; pode ter
+      forma (..., n), com o tempo no último eixo (ex.: três componentes),
+      e todos os canais de um trecho são filtrados numa única chamada
+    - runs: trechos contíguos (i0, i1)
+    - b, a: coeficientes do filtro (a=1.0 para FIR)
+    - sos: seções de segunda ordem (ex.: butter_bandpass_sos), usadas no
+      lugar de (b, a); preferível para filtros IIR de banda estreita
+    - steady_state: inicia cada trecho no regime permanente da primeira amostra
+    - max_workers: número máximo de threads
+
+    Retorna:
+    - filtered: np.ma.MaskedArray com a mesma máscara do traço de entrada
+    """
+    if sos is None and b is None:
+        raise ValueError("Forneça (b, a) ou sos")
+
+    values = np.ma.getdata(data)
+    if sos is None:
+        a = np.atleast_1d(1.0 if a is None else a)
+
+    def _filter_run(run):
+        i0, i1 = run
+        x = values[..., i0:i1]
+        x0 = x[..., :1]
+        if sos is not None:
+            if steady_state:
+                # Estado inicial com forma (n_seções, ..., 2)
+                zi = sosfilt_zi(sos).reshape((len(sos),) + (1,) * (x.ndim - 1) + (2,)) * x0[None]
+                y, _ = sosfilt(sos, x, axis=-1, zi=zi)
+            else:
+                y = sosfilt(sos, x, axis=-1)
+        elif steady_state:
+            y, _ = lfilter(b, a, x, axis=-1, zi=lfilter_zi(b, a) * x0)
+        else:
+            y = lfilter(b, a, x, axis=-1)
+        return y
+
+    filtered = np.zeros(values.shape)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for (i0, i1), y in zip(runs, executor.map(_filter_run, runs)):
+            filtered[..., i0:i1] = y
+
+    return np.ma.MaskedArray(filtered, mask=np.ma.getmaskarray(data).copy())
+
+
+def summarize_gaps(gaps):
+    """
+    Conta as lacunas por tipo.
+    """
+    summary = {'overlap': 0, 'short': 0, 'long': 0}
+    for gap in gaps:
+        summary[gap['type']] += 1
+    return summary
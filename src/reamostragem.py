@@ -0,0 +1,185 @@
+"""
+Módulo para harmonização da frequência de amostragem (reamostragem polifásica).
+"""
+
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import firwin, resample_poly, upfirdn
+
+
+def rational_ratio(fs_in, fs_out, max_denominator=1000):
+    """
+    Aproxima a razão fs_out/fs_in por uma fração irredutível up/down.
+
+    Parâmetros:
+    - fs_in: frequência de amostragem de entrada (Hz)
+    - fs_out: frequência de amostragem desejada (Hz)
+    - max_denominator: maior denominador aceito na aproximação
+
+    Retorna:
+    - up, down: fatores de interpolação e decimação
+    """
+    if fs_in <= 0 or fs_out <= 0:
+        raise ValueError("As frequências de amostragem devem ser positivas")
+
+    ratio = Fraction(fs_out / fs_in).limit_denominator(max_denominator)
+    return ratio.numerator, ratio.denominator
+
+
+@lru_cache(maxsize=None)
+def design_resampling_filter(up, down, window=('kaiser', 5.0)):
+    """
+    Projeta o filtro anti-aliasing da reamostragem up/down.
+
+    O projeto é o mesmo usado por scipy.signal.resample_poly e fica em cache
+    por razão (up, down), de modo que todos os canais da rede com o mesmo par
+    de frequências compartilham os mesmos coeficientes.
+
+    Retorna:
+    - taps: coeficientes do filtro FIR (somente leitura)
+    """
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1.0 / max_rate, window=window)
+    taps.setflags(write=False)
+    return taps
+
+
+def resample_signal(data, fs_in, fs_out):
+    """
+    Reamostra um sinal completo para a frequência fs_out (modo lote).
+
+    Parâmetros:
+    - data: sinal de entrada
+    - fs_in: frequência de amostragem do sinal (Hz)
+    - fs_out: frequência de amostragem desejada (Hz)
+
+    Retorna:
+    - y: sinal reamostrado
+    """
+    data = np.asarray(data, dtype=float)
+    up, down = rational_ratio(fs_in, fs_out)
+    if up == down:
+        return data.copy()
+
+    taps = design_resampling_filter(up, down)
+    return resample_poly(data, up, down, window=taps)
+
+
+def harmonize_sampling_rates(signals, fs_target):
+    """
+    Leva todos os sinais de uma rede à mesma frequência de amostragem.
+
+    Parâmetros:
+    - signals: lista de pares (data, fs)
+    - fs_target: frequência de amostragem comum (Hz)
+
+    Retorna:
+    - lista de sinais reamostrados para fs_target
+    """
+    return [resample_signal(data, fs, fs_target) for data, fs in signals]
+
+
+def init_resampler_state(fs_in, fs_out):
+    """
+    Cria o estado de um reamostrador contínuo (modo streaming).
+
+    A concatenação das saídas de resample_chunk seguida de flush_resampler
+    reproduz exatamente o resultado de resample_signal sobre o sinal inteiro.
+    """
+    up, down = rational_ratio(fs_in, fs_out)
+    if up == down:
+        return {'up': up, 'down': down, 'n_in': 0, 'n_out': 0}
+
+    taps = design_resampling_filter(up, down)
+
+    # Mesmo alinhamento de resample_poly: zeros antes do filtro para centrar a saída
+    half_len = (len(taps) - 1) // 2
+    n_pre_pad = down - half_len % down
+    h = np.concatenate((np.zeros(n_pre_pad), taps * up))
+
+    return {
+        'up': up,
+        'down': down,
+        'h': h,
+        'n_pre_remove': (half_len + n_pre_pad) // down,
+        'history_len': int(np.ceil(len(h) / up)) + 1,
+        'history': np.zeros(0),
+        'history_start': 0,
+        'n_in': 0,
+        'n_out': 0,
+    }
+
+
+def _resample_available(state, block):
+    """
+    Calcula as amostras de saída já determinadas pelas entradas recebidas.
+    """
+    up, down = state['up'], state['down']
+    n_total = state['n_in'] + len(block)
+
+    # O histórico sempre começa em múltiplo de down, mantendo a fase polifásica
+    buf_start = state['history_start']
+    buffer = np.concatenate((state['history'], block))
+    y_local = upfirdn(state['h'], buffer, up, down)
+
+    # Saídas globais m com m*down <= (n_total - 1)*up já estão completas
+    m_first = state['n_out']
+    m_last = (n_total - 1) * up // down if n_total > 0 else -1
+    offset = buf_start * up // down
+    y = y_local[m_first - offset:m_last + 1 - offset]
+
+    new_start = max((n_total - state['history_len']) // down * down, buf_start)
+    state['history'] = buffer[new_start - buf_start:]
+    state['history_start'] = new_start
+    state['n_in'] = n_total
+    state['n_out'] = m_first + len(y)
+    return y
+
+
+def resample_chunk(chunk, state):
+    """
+    Reamostra um bloco de um fluxo contínuo, preservando o estado entre blocos.
+
+    Parâmetros:
+    - chunk: próximo bloco de amostras
+    - state: estado criado por init_resampler_state
+
+    Retorna:
+    - y: amostras reamostradas disponíveis até este bloco
+    - state: estado atualizado
+    """
+    chunk = np.asarray(chunk, dtype=float)
+    if state['up'] == state['down']:
+        state['n_in'] += len(chunk)
+        return chunk.copy(), state
+
+    y = _resample_available(state, chunk)
+
+    # Descarta o atraso do filtro no início do fluxo
+    n_emitted = state['n_out'] - len(y)
+    skip = max(state['n_pre_remove'] - n_emitted, 0)
+    return y[skip:], state
+
+
+def flush_resampler(state):
+    """
+    Finaliza o fluxo, devolvendo as amostras retidas pelo atraso do filtro.
+    """
+    up, down = state['up'], state['down']
+    if up == down or state['n_in'] == 0:
+        return np.zeros(0)
+
+    n_signal = state['n_in']
+    n_target = -(-n_signal * up // down) + state['n_pre_remove']
+    n_zeros = -(-(n_target * down) // up) - n_signal + 1
+
+    n_emitted = state['n_out']
+    y = _resample_available(state, np.zeros(max(n_zeros, 0)))
+
+    y_start = max(state['n_pre_remove'] - n_emitted, 0)
+    y_end = n_target - n_emitted
+    state['n_in'] = n_signal
+    return y[y_start:y_end]
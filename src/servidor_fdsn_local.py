@@ -0,0 +1,154 @@
+"""
+Servidor FDSN dataselect local que serve os arquivos MiniSEED de dados/.
+
+Permite testar o download em lote (vazão, novas tentativas e retomada) sem
+acesso à internet. Como no padrão FDSN, pedidos sem dados recebem 204 e
+caminhos desconhecidos recebem 404:
+
+    python -m src.servidor_fdsn_local --port 8080 --failure-rate 0.2
+"""
+
+import argparse
+import glob
+import io
+import os
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DATASELECT_PATH = "/fdsnws/dataselect/1/query"
+
+# Nomes curtos e longos aceitos pelo padrão FDSN
+_PARAM_ALIASES = {
+    'net': 'network', 'sta': 'station', 'loc': 'location', 'cha': 'channel',
+    'start': 'starttime', 'end': 'endtime',
+}
+
+
+def load_archive(data_dir):
+    """
+    Lê todos os arquivos MiniSEED de data_dir num único Stream.
+    """
+    from obspy import Stream, read
+
+    st = Stream()
+    for path in sorted(glob.glob(os.path.join(data_dir, '*.mseed'))):
+        st += read(path)
+    return st
+
+
+def _parse_query(query):
+    params = {}
+    for key, values in urllib.parse.parse_qs(query).items():
+        params[_PARAM_ALIASES.get(key, key)] = values[0]
+    return params
+
+
+def _make_handler(archive, latency, failure_rate, rng):
+    from obspy import UTCDateTime
+
+    lock = threading.Lock()
+
+    class DataselectHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path != DATASELECT_PATH:
+                self.send_error(404, "Serviço não encontrado")
+                return
+
+            if latency > 0:
+                time.sleep(latency)
+            with lock:
+                fail = rng.random() < failure_rate
+            if fail:
+                self.send_error(503, "Falha simulada")
+                return
+
+            params = _parse_query(url.query)
+            try:
+                starttime = UTCDateTime(params['starttime'])
+                endtime = UTCDateTime(params['endtime'])
+            except (KeyError, ValueError):
+                self.send_error(400, "Parâmetros starttime/endtime inválidos")
+                return
+
+            location = params.get('location', '*')
+            selected = archive.select(
+                network=params.get('network', '*'),
+                station=params.get('station', '*'),
+                location='' if location == '--' else location,
+                channel=params.get('channel', '*'),
+            ).slice(starttime, endtime)
+            selected.traces = [tr for tr in selected if tr.stats.npts > 0]
+
+            if len(selected) == 0:
+                self.send_response(204)
+                self.end_headers()
+                return
+
+            buffer = io.BytesIO()
+            selected.write(buffer, format='MSEED')
+            body = buffer.getvalue()
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.fdsn.mseed')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return DataselectHandler
+
+
+def make_fdsn_server(data_dir, host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, seed=None):
+    """
+    Cria o servidor FDSN dataselect local.
+
+    Parâmetros:
+    - data_dir: diretório com os arquivos MiniSEED servidos
+    - host, port: endereço de escuta (port=0 escolhe uma porta livre)
+    - latency: atraso artificial por requisição (s)
+    - failure_rate: fração de requisições respondidas com erro 503
+    - seed: semente das falhas simuladas
+
+    Retorna:
+    - server: ThreadingHTTPServer (ainda não iniciado)
+    """
+    archive = load_archive(data_dir)
+    handler = _make_handler(archive, latency, failure_rate, random.Random(seed))
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_local_fdsn_server(data_dir, **kwargs):
+    """
+    Inicia o servidor local numa thread em segundo plano.
+
+    Retorna:
+    - server: servidor em execução (encerrar com server.shutdown())
+    - base_url: URL base a passar para bulk_download
+    """
+    server = make_fdsn_server(data_dir, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor FDSN dataselect local")
+    parser.add_argument('--data-dir', default=os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'dados'))
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = make_fdsn_server(args.data_dir, args.host, args.port, args.latency, args.failure_rate)
+    print(f"Servindo {args.data_dir} em http://{args.host}:{args.port}{DATASELECT_PATH}")
+    server.serve_forever()
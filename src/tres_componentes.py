@@ -0,0 +1,274 @@
+"""
+Módulo para processamento de três componentes (rotação, polarização e gatilho combinado).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from src.montagem_traco import segments_from_stream, assemble_segments, filter_segments
+
+
+def load_three_components(st, fs=None, azimuth_1=0.0, max_fill_gap=1.0):
+    """
+    Seleciona e alinha as componentes Z/N/E (ou Z/1/2) de um Stream.
+
+    As componentes são montadas separadamente (lacunas/sobreposições) e
+    recortadas no intervalo comum. Componentes 1/2 são giradas para N/E
+    usando o azimute da componente 1.
+
+    Parâmetros:
+    - st: Stream do ObsPy com as três componentes de uma estação
+    - fs: frequência de amostragem comum (Hz); None usa a da componente Z
+    - azimuth_1: azimute da componente 1 (graus a partir do norte)
+    - max_fill_gap: ver assemble_segments
+
+    Retorna:
+    - data: np.ma.MaskedArray de forma (3, n) na ordem Z, N, E
+    - fs: frequência de amostragem (Hz)
+    - starttime: instante da primeira amostra (s, epoch)
+    - runs: trechos (i0, i1) contíguos nas três componentes ao mesmo tempo
+    """
+    codes = {tr.stats.channel[-1] for tr in st}
+    if {'Z', 'N', 'E'} <= codes:
+        order = 'ZNE'
+    elif {'Z', '1', '2'} <= codes:
+        order = 'Z12'
+    else:
+        raise ValueError(f"Componentes insuficientes no Stream: {sorted(codes)}")
+
+    assembled = []
+    for code in order:
+        segments = segments_from_stream(st.select(component=code))
+        if fs is None:
+            fs = segments[0]['fs']
+        data, runs, _ = assemble_segments(segments, fs=fs, max_fill_gap=max_fill_gap)
+        assembled.append((segments[0]['start'], data, runs))
+
+    # Intervalo comum às três componentes
+    t_start = max(start for start, _, _ in assembled)
+    t_end = min(start + len(data) / fs for start, data, _ in assembled)
+    n = int(np.floor((t_end - t_start) * fs))
+    if n <= 0:
+        raise ValueError("As componentes não têm intervalo em comum")
+
+    values = np.zeros((3, n))
+    mask = np.zeros((3, n), dtype=bool)
+    in_run = np.ones(n, dtype=bool)
+    for i, (start, data, runs) in enumerate(assembled):
+        offset = int(round((t_start - start) * fs))
+        values[i] = np.ma.getdata(data)[offset:offset + n]
+        mask[i] = np.ma.getmaskarray(data)[offset:offset + n]
+
+        # Amostras fora dos trechos contíguos (lacunas longas) desta componente
+        component_in_run = np.zeros(len(data), dtype=bool)
+        for i0, i1 in runs:
+            component_in_run[i0:i1] = True
+        in_run &= component_in_run[offset:offset + n]
+
+    if order == 'Z12':
+        values[1], values[2] = rotate_12_to_ne(values[1], values[2], azimuth_1)
+
+    # Uma amostra inválida em qualquer componente invalida o vetor inteiro
+    mask[:] = mask.any(axis=0)
+
+    # Trechos comuns: bordas onde in_run muda de valor
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], in_run, [False])).astype(int)))
+    shared_runs = [(int(i0), int(i1)) for i0, i1 in edges.reshape(-1, 2)]
+
+    return np.ma.MaskedArray(values, mask=mask), fs, t_start, shared_runs
+
+
+def bandpass_components(data, runs, b=None, a=None, sos=None, max_workers=None):
+    """
+    Filtra as três componentes juntas, trecho contíguo por trecho contíguo.
+
+    Em cada trecho as três componentes são filtradas numa única chamada (eixo
+    do tempo); lacunas longas não são atravessadas pelo filtro.
+
+    Parâmetros:
+    - data: array (3, n) ou np.ma.MaskedArray (ver load_three_components)
+    - runs: trechos contíguos (i0, i1) comuns às componentes
+    - b, a ou sos: coeficientes do filtro (ver filter_segments)
+    - max_workers: número máximo de threads
+
+    Retorna:
+    - filtered: np.ma.MaskedArray (3, n)
+    """
+    return filter_segments(data, runs, b, a, sos=sos, max_workers=max_workers)
+
+
+def rotate_12_to_ne(data_1, data_2, azimuth_1):
+    """
+    Gira componentes horizontais ortogonais 1/2 para N/E.
+    """
+    az = np.radians(azimuth_1)
+    north = data_1 * np.cos(az) - data_2 * np.sin(az)
+    east = data_1 * np.sin(az) + data_2 * np.cos(az)
+    return north, east
+
+
+def rotate_ne_to_rt(north, east, back_azimuth):
+    """
+    Gira N/E para radial/transversal dado o back-azimute (graus).
+
+    back_azimuth pode ser escalar ou um array por amostra.
+    """
+    baz = np.radians(back_azimuth)
+    radial = -east * np.sin(baz) - north * np.cos(baz)
+    transverse = -east * np.cos(baz) + north * np.sin(baz)
+    return radial, transverse
+
+
+def polarization_attributes(data, fs, win_len, step=None):
+    """
+    Atributos de polarização por covariância em janelas deslizantes.
+
+    As janelas são vistas (sem cópia) do sinal. A covariância de cada janela
+    vem das somas de produtos na própria vista, Σxᵢxⱼ/n − x̄ᵢx̄ⱼ, sem criar
+    cópias centradas das janelas; os autovalores de todas as janelas são
+    calculados de uma vez.
+
+    Parâmetros:
+    - data: array (3, n) na ordem Z, N, E
+    - fs: frequência de amostragem (Hz)
+    - win_len: duração da janela (s)
+    - step: passo entre janelas (s); padrão: metade da janela
+
+    Retorna:
+    - dicionário com 'times' (centro das janelas, s), 'rectilinearity',
+      'planarity', 'azimuth' e 'incidence' (graus) e 'eigenvalues' (n_win, 3)
+    """
+    mask = np.ma.getmaskarray(data).any(axis=0)
+    data = np.ma.getdata(data)
+    nwin = int(round(win_len * fs))
+    nstep = int(round(step * fs)) if step is not None else max(nwin // 2, 1)
+
+    # Remove a média global de cada componente (amostras finitas) para
+    # reduzir o cancelamento numérico em Σxᵢxⱼ/n − x̄ᵢx̄ⱼ
+    finite = np.isfinite(data)
+    offset = np.where(finite, data, 0.0).sum(axis=-1) / np.maximum(finite.sum(axis=-1), 1)
+    data = data - offset[:, None]
+
+    windows = sliding_window_view(data, nwin, axis=-1)[:, ::nstep]
+    means = windows.mean(axis=-1).T
+    cov = np.einsum('iwk,jwk->wij', windows, windows) / nwin - means[:, :, None] * means[:, None, :]
+
+    # Janelas com amostras mascaradas ou não finitas ficam como NaN
+    invalid = sliding_window_view(mask, nwin)[::nstep].any(axis=-1) | ~np.isfinite(cov).all(axis=(1, 2))
+    cov[invalid] = np.eye(3)
+
+    eigvals, eigvecs = np.linalg.eigh(cov)
+    l3, l2, l1 = eigvals[:, 0], eigvals[:, 1], eigvals[:, 2]
+    principal = eigvecs[:, :, 2]
+    # Autovetor com componente vertical positiva (sinal arbitrário)
+    principal = principal * np.where(principal[:, :1] < 0, -1.0, 1.0)
+
+    eps = np.finfo(float).tiny
+    attributes = {
+        'rectilinearity': 1 - (l2 + l3) / (2 * l1 + eps),
+        'planarity': 1 - 2 * l3 / (l1 + l2 + eps),
+        'azimuth': np.degrees(np.arctan2(principal[:, 2], principal[:, 1])) % 360,
+        'incidence': np.degrees(np.arccos(np.clip(principal[:, 0], -1.0, 1.0))),
+        'eigenvalues': eigvals[:, ::-1],
+    }
+    for values in attributes.values():
+        values[invalid] = np.nan
+
+    attributes['times'] = (np.arange(windows.shape[1]) * nstep + nwin / 2) / fs
+    return attributes
+
+
+def sta_lta(cf, nsta, nlta):
+    """
+    Razão STA/LTA clássica calculada com somas acumuladas no último eixo.
+
+    Parâmetros:
+    - cf: função característica (ex.: energia), 1D ou (n_comp, n)
+    - nsta, nlta: comprimentos das janelas curta e longa (amostras)
+
+    Retorna:
+    - ratio: mesmo formato de cf; zero antes de completar a janela longa
+    """
+    cf = np.asarray(cf, dtype=float)
+    csum = np.concatenate((np.zeros(cf.shape[:-1] + (1,)), np.cumsum(cf, axis=-1)), axis=-1)
+    sta = (csum[..., nsta:] - csum[..., :-nsta]) / nsta
+    lta = (csum[..., nlta:] - csum[..., :-nlta]) / nlta
+
+    ratio = np.zeros_like(cf)
+    # Alinha as janelas pelo último índice de cada uma
+    ratio[..., nlta - 1:] = sta[..., nlta - nsta:] / np.maximum(lta, np.finfo(float).tiny)
+    return ratio
+
+
+def trigger_onsets(ratio, thr_on, thr_off):
+    """
+    Encontra os intervalos em que a razão passa de thr_on até cair abaixo de thr_off.
+
+    Retorna:
+    - array (n_gatilhos, 2) com índices de início e fim
+    """
+    above = ratio > thr_on
+    on = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+    if above[0]:
+        on = np.concatenate(([0], on))
+    if len(on) == 0:
+        return np.zeros((0, 2), dtype=int)
+
+    # Fim: primeira amostra abaixo de thr_off após o início (ou o fim do sinal)
+    below = np.concatenate((np.flatnonzero(ratio < thr_off), [len(ratio) - 1]))
+    off = below[np.searchsorted(below, on)]
+
+    # Descarta inícios que ocorrem dentro de um gatilho anterior
+    prev_end = np.concatenate(([-1], np.maximum.accumulate(off)[:-1]))
+    keep = on > prev_end
+    return np.column_stack((on[keep], off[keep]))
+
+
+def combined_trigger(data, fs, sta=1.0, lta=30.0, thr_on=3.0, thr_off=1.5, min_components=1, runs=None):
+    """
+    Gatilho STA/LTA sobre a energia vetorial das três componentes.
+
+    O STA/LTA é calculado em cada trecho contíguo separadamente, de modo que
+    lacunas longas (preenchidas com zeros) não derrubam a LTA e não disparam
+    o gatilho quando os dados recomeçam. A razão fica em zero na primeira
+    janela longa de cada trecho.
+
+    Parâmetros:
+    - data: array (3, n) filtrado
+    - fs: frequência de amostragem (Hz)
+    - sta, lta: janelas curta e longa (s)
+    - thr_on, thr_off: limiares de disparo e desligamento
+    - min_components: número mínimo de componentes com STA/LTA individual
+      acima de thr_on em algum instante do gatilho combinado (coincidência)
+    - runs: trechos contíguos (i0, i1) comuns às componentes (ver
+      load_three_components); padrão: o registro inteiro
+
+    Retorna:
+    - triggers: array (n_gatilhos, 2) de índices (início, fim)
+    - ratio: STA/LTA combinado
+    - component_ratios: STA/LTA de cada componente, forma (3, n)
+    """
+    # Lacunas curtas interpoladas seguem no cálculo, como na filtragem
+    values = np.ma.getdata(data)
+    nsta, nlta = int(round(sta * fs)), int(round(lta * fs))
+    if runs is None:
+        runs = [(0, values.shape[-1])]
+
+    component_ratios = np.zeros(values.shape)
+    ratio = np.zeros(values.shape[-1])
+    triggers = []
+    for i0, i1 in runs:
+        if i1 - i0 < nlta:
+            continue
+        energy = values[:, i0:i1]**2
+        component_ratios[:, i0:i1] = sta_lta(energy, nsta, nlta)
+        ratio[i0:i1] = sta_lta(energy.sum(axis=0), nsta, nlta)
+        triggers.append(trigger_onsets(ratio[i0:i1], thr_on, thr_off) + i0)
+    triggers = np.concatenate(triggers) if triggers else np.zeros((0, 2), dtype=int)
+
+    if min_components > 1 and len(triggers):
+        # Coincidência avaliada no trecho de cada gatilho combinado
+        above = np.maximum.reduceat(component_ratios, triggers.ravel(), axis=-1)[:, ::2] > thr_on
+        triggers = triggers[above.sum(axis=0) >= min_components]
+
+    return triggers, ratio, component_ratios
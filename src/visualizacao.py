@@ -34,19 +34,26 @@ def plot_time_domain(times, original, filtered=None, title="Domínio do Tempo",
 
 
 def plot_frequency_domain(fs, original, filtered=None, title="Domínio da Frequência", 
-                         xlabel="Frequência (Hz)", ylabel="Magnitude", max_freq=None):
+                         xlabel="Frequência (Hz)", ylabel="Magnitude", max_freq=None,
+                         spectrum=None):
     """
     Plota espectro de frequência.
-    """
-    freqs = np.fft.rfftfreq(len(original), d=1/fs)
-    fft_original = np.abs(np.fft.rfft(original))
     
+    Se spectrum = (freqs, psd_original, psd_filtered) for fornecido (ex.: PSDs
+    de Welch de src.espectro), plota esses espectros sem calcular a FFT.
+    """
     fig, ax = plt.subplots(figsize=(12, 4))
     
-    ax.semilogy(freqs, fft_original, 'gray', alpha=0.5, label='Espectro Original')
-    if filtered is not None:
-        fft_filtered = np.abs(np.fft.rfft(filtered))
-        ax.semilogy(freqs, fft_filtered, 'b', linewidth=1.5, label='Espectro Filtrado')
+    if spectrum is not None:
+        freqs, spec_original, spec_filtered = spectrum
+    else:
+        freqs = np.fft.rfftfreq(len(original), d=1/fs)
+        spec_original = np.abs(np.fft.rfft(original))
+        spec_filtered = np.abs(np.fft.rfft(filtered)) if filtered is not None else None
+    
+    ax.semilogy(freqs, spec_original, 'gray', alpha=0.5, label='Espectro Original')
+    if spec_filtered is not None:
+        ax.semilogy(freqs, spec_filtered, 'b', linewidth=1.5, label='Espectro Filtrado')
     
     ax.set_title(title)
     ax.set_xlabel(xlabel)